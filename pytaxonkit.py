@@ -41,18 +41,27 @@
 
 from builtins import list as pylist
 from collections import namedtuple
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from functools import lru_cache
+from itertools import islice
 import json
 import os
-import pandas as pd
-from pandas import UInt32Dtype, StringDtype
 from pytaxonkit_version import get_versions
-import pytest
-from subprocess import Popen, PIPE
+from shutil import which
+from subprocess import DEVNULL, PIPE, Popen
 import sys
-from tempfile import NamedTemporaryFile
+from threading import Thread
 from warnings import warn
 
+try:
+    import orjson as jsonlib
+except ImportError:  # pragma: no cover
+    jsonlib = json
+
+# pandas is imported by the functions that return DataFrames rather than here, so that importing
+# pytaxonkit stays fast for callers of filter, lca, list, and list_ranks*
+
 __version__ = get_versions()["version"]
 del get_versions
 
@@ -65,18 +74,260 @@ class NCBITaxonomyDumpNotFoundError(FileNotFoundError):
     pass
 
 
+@lru_cache(maxsize=None)
+def _which(program):
+    # Resolve the path once rather than searching PATH on every spawn; if the program is not found,
+    # Popen falls back to its own search and raises the usual FileNotFoundError
+    return which(program)
+
+
+@contextmanager
+def _open_taxonkit(*arglists, input=None):
+    """Run one or more taxonkit commands, the output of each piped into the next
+
+    All processes in the pipeline run concurrently, as with a shell pipeline, so intermediate
+    output never needs to be buffered in Python or written to disk. The standard output of the
+    final command is yielded as a file object, so that it can be parsed while taxonkit is still
+    running. Input and error streams are serviced by background threads to avoid deadlocks. The
+    pipes carry UTF-8 bytes; only taxonkit's error messages are decoded here, so that callers can
+    parse the output directly from bytes wherever text is not needed.
+
+    The `input` for the first command may be a string or an iterable of strings; the latter are
+    written one at a time, so that large queries never need to be joined into a single string. If
+    there is no input, the first command reads from the null device instead of a pipe.
+    """
+    procs = pylist()
+    stdin = DEVNULL if input is None else PIPE
+    try:
+        for arglist in arglists:
+            proc = Popen(
+                arglist,
+                executable=_which(arglist[0]),
+                stdin=stdin,
+                stdout=PIPE,
+                stderr=PIPE,
+                # Descriptors opened by Python are non-inheritable (PEP 446), so there is nothing
+                # for close_fds to do; disabling it saves a pass over every possible descriptor
+                close_fds=False,
+            )
+            if procs:
+                # The downstream process is now the only reader of this pipe
+                procs[-1].stdout.close()
+                procs[-1].stdout = None
+            procs.append(proc)
+            stdin = proc.stdout
+    except BaseException:
+        # A later command could not be started; tear down the part of the pipeline that was, so
+        # that neither processes nor pipes are leaked
+        for proc in procs:
+            proc.kill()
+            for stream in (proc.stdin, proc.stdout, proc.stderr):
+                if stream is not None:
+                    stream.close()
+            proc.wait()
+        raise
+    stdout = procs[-1].stdout
+    procs[-1].stdout = None
+    stdin = procs[0].stdin
+    procs[0].stdin = None
+    chunks = (input,) if isinstance(input, str) else input
+    errors = dict()
+    feederrors = pylist()
+
+    def feed():
+        try:
+            # If taxonkit exits without reading all of its input, the failure is reported by its
+            # exit status and error output below rather than by the broken pipe
+            with suppress(BrokenPipeError):
+                for chunk in chunks:
+                    stdin.write(chunk.encode())
+        except BaseException as error:  # pragma: no cover
+            feederrors.append(error)
+        finally:
+            with suppress(BrokenPipeError):
+                stdin.close()
+
+    def communicate(proc):
+        errors[proc] = proc.communicate()[1]
+
+    threads = [Thread(target=communicate, args=(proc,)) for proc in procs]
+    if stdin is not None:
+        threads.append(Thread(target=feed))
+    for thread in threads:
+        thread.start()
+
+    def finish(interrupted=False):
+        stdout.close()
+        for thread in threads:
+            thread.join()
+        if feederrors:
+            raise feederrors[0]  # pragma: no cover
+        for proc in procs:
+            # If the caller stops reading early, taxonkit may be terminated by SIGPIPE; that is not
+            # a taxonkit error and should not mask the caller's exception
+            failed = proc.returncode > 0 if interrupted else proc.returncode != 0
+            if failed:
+                raise TaxonKitCLIError(errors[proc].decode(errors="replace"))  # pragma: no cover
+
+    try:
+        yield stdout
+    except BaseException:
+        finish(interrupted=True)
+        raise
+    finish()
+
+
+def _run_taxonkit(*arglists, input=None):
+    with _open_taxonkit(*arglists, input=input) as stdout:
+        return stdout.read()
+
+
+@lru_cache(maxsize=64)
+def _run_taxonkit_cached(arglist):
+    # For commands without input, whose output depends only on the installed taxonomy data
+    return _run_taxonkit(pylist(arglist)).decode()
+
+
+@lru_cache(maxsize=None)
 def _get_taxonkit_version():
-    proc = Popen(["taxonkit", "version"], stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    out, err = proc.communicate()
-    if proc.returncode != 0:
-        raise TaxonKitCLIError(err)  # pragma: no cover
-    return out.strip()
+    out = _run_taxonkit(["taxonkit", "version"])
+    return out.decode().strip()
+
+
+def _join_ids(ids, sep):
+    # NumPy arrays and pandas Series convert to native Python scalars in a single C-level call,
+    # which makes stringifying large inputs far cheaper than str() on each NumPy scalar
+    if hasattr(ids, "tolist"):
+        ids = ids.tolist()
+    return sep.join(map(str, ids))
+
+
+def _id_batches(ids, batchsize):
+    """Split query values into lists of strings of (at most) the given size
+
+    Returns `None` if there is nothing to query, so that callers can warn before taxonkit is run.
+    """
+    if hasattr(ids, "tolist"):
+        ids = ids.tolist()
+    ids = map(str, ids)
+    first = pylist(islice(ids, batchsize))
+    if first in ([], [""]):
+        return None
+
+    def batches(batch):
+        while batch:
+            yield batch
+            batch = pylist(islice(ids, batchsize))
+
+    return batches(first)
+
+
+def _id_lines(ids, chunksize=10000):
+    """Format query values one per line, in chunks suitable as input for `_open_taxonkit`
+
+    Returns `None` if there is nothing to query.
+    """
+    batches = _id_batches(ids, chunksize)
+    if batches is None:
+        return None
+    return ("\n".join(batch) + "\n" for batch in batches)
+
+
+def _dedup_ids(ids):
+    """Collapse repeated query values, compared as the text that taxonkit would receive
+
+    Returns the distinct values in order of first appearance, along with the position of each
+    original value among them; the positions are `None` if no value is repeated. Empty and comment
+    values are dropped, since taxonkit skips those input lines without reporting anything.
+    """
+    if hasattr(ids, "tolist"):
+        ids = ids.tolist()
+    texts = (str(value) for value in ids)
+    positions = dict()
+    codes = [
+        positions.setdefault(text, len(positions)) for text in texts if text and text[0] != "#"
+    ]
+    if len(positions) == len(codes):
+        return pylist(positions), None
+    return pylist(positions), codes
+
+
+def _collect_frames(func, shards, ids, codes, workers):
+    """Concatenate the results of `func` for each shard of the distinct `ids` from `_dedup_ids`
+
+    The result is expanded back to one row per original value, as positioned by `codes`.
+    """
+    data = _concat_frames(_map_shards(func, shards))
+    if codes is None:
+        return data
+    if len(data) == len(ids):
+        # taxonkit reports one line per query, in query order, so row i holds the result for the
+        # i-th distinct value
+        return data.iloc[codes].reset_index(drop=True)
+    # Otherwise the rows cannot be matched to the queries by position, so every value is queried
+    # as given instead
+    return _concat_frames(_map_shards(func, _id_shards([ids[code] for code in codes], workers)))
+
+
+def _id_shards(ids, workers):
+    """Format query values as for `_id_lines`, split evenly into (at most) `workers` shards
+
+    Returns `None` if there is nothing to query.
+    """
+    if workers <= 1:
+        idlist = _id_lines(ids)
+        return None if idlist is None else [idlist]
+    if hasattr(ids, "tolist"):
+        ids = ids.tolist()
+    ids = pylist(ids)
+    size = max(-(-len(ids) // workers), 1)
+    shards = (_id_lines(ids[i : i + size]) for i in range(0, len(ids), size))
+    return [shard for shard in shards if shard is not None] or None
+
+
+def _map_shards(func, shards):
+    # Each shard is processed by its own taxonkit process(es); the threads only wait on them
+    if len(shards) == 1:
+        return [func(shards[0])]
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        return pylist(pool.map(func, shards))
+
+
+def _concat_frames(frames):
+    import pandas as pd
+
+    if len(frames) == 1:
+        return frames[0]
+    for column in frames[0].columns:
+        dtypes = [frame[column].dtype for frame in frames]
+        if any(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+        if any(dtype != dtypes[0] for dtype in dtypes) and not all(
+            pd.api.types.is_numeric_dtype(dtype) for dtype in dtypes
+        ):
+            # Columns that echo the query, such as TaxID, are read as integers from a shard of
+            # valid taxids but as text from one with a non-numeric query; a single read of all the
+            # rows would have yielded text throughout
+            frames = [
+                frame.assign(**{column: frame[column].astype(str)})
+                if pd.api.types.is_integer_dtype(frame[column].dtype)
+                else frame
+                for frame in frames
+            ]
+    data = pd.concat(frames, ignore_index=True)
+    # A categorical column only survives concatenation if its categories are the same in every
+    # shard, which they generally are not
+    for column, dtype in frames[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            data[column] = data[column].astype("category")
+    return data
 
 
 def log(*args, level="debug"):  # pragma: no cover
     print(f"[pytaxonkit::{level}]", *args, file=sys.stderr)
 
 
+@lru_cache(maxsize=8)
 def validate_data_dir(path):
     filepath = os.path.join(path, "nodes.dmp")
     if not os.path.isfile(filepath) or os.stat(filepath).st_size == 0:
@@ -84,14 +335,14 @@ def validate_data_dir(path):
     return os.path.realpath(path)
 
 
-def test_validate_data_dir():
-    realdir = os.path.realpath(os.path.expanduser("~/.taxonkit/"))
-    assert validate_data_dir(os.path.expanduser("~/.taxonkit/")) == realdir
-    with pytest.raises(NCBITaxonomyDumpNotFoundError):
-        assert validate_data_dir("/path/to/a/non/existent/directory/taxonkit")
+# Thread count passed to taxonkit by every function whose own `threads` argument is not set; `None`
+# defers to taxonkit's own default
+DEFAULT_THREADS = None
 
 
 def validate_threads(value):
+    if not value:
+        value = DEFAULT_THREADS
     if value is None:
         return None
     try:
@@ -102,20 +353,26 @@ def validate_threads(value):
         return None
 
 
-def test_validate_threads(capsys):
-    assert validate_threads(None) is None
-    assert validate_threads(2) == "2"
-    assert validate_threads("16") == "16"
-    out, err = capsys.readouterr()
-    assert out == err == ""
-    assert validate_threads("StuffedCrust") is None
-    out, err = capsys.readouterr()
-    assert out == ""
-    m = '[pytaxonkit::warning] invalid thread count "StuffedCrust"; resetting to taxonkit default'
-    assert err.strip() == m
+def __getattr__(name):
+    # The taxonkit version is only queried (once) when `__taxonkitversion__` is first accessed,
+    # so that importing pytaxonkit does not spawn a subprocess
+    if name == "__taxonkitversion__":
+        return _get_taxonkit_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
+def clear_caches():
+    """forget results remembered from previous taxonkit calls
 
-__taxonkitversion__ = _get_taxonkit_version()
+    To avoid redundant work, pytaxonkit remembers the location of the `taxonkit` program, the
+    validated `data_dir` locations, the taxonkit version, the rank lists, and the results of recent
+    single-query `lca` calls for the lifetime of the Python process. Call this function after
+    updating the NCBI taxonomy files or installing a different taxonkit, so that subsequent calls
+    reflect the change.
+    """
+    caches = (_which, validate_data_dir, _get_taxonkit_version, _run_taxonkit_cached, _lca_single)
+    for function in caches:
+        function.cache_clear()
 
 
 # -------------------------------------------------------------------------------------------------
@@ -125,9 +382,26 @@ __taxonkitversion__ = _get_taxonkit_version()
 BasicTaxon = namedtuple("BasicTaxon", ["taxid", "rank", "name"])
 
 
+def _parse_taxon(taxonstr, raw=False):
+    # Keys have the form "9606 [species] Homo sapiens"; the name itself may contain brackets,
+    # e.g. "[Eubacterium] rectale", so only the first delimiter of each kind is significant
+    taxid, _, remainder = taxonstr.partition(" [")
+    rank, _, name = remainder.partition("] ")
+    # Ranks come from a small vocabulary, so interning them lets every taxon of a large tree share
+    # a handful of string objects
+    taxon = (int(taxid), sys.intern(rank), name)
+    return taxon if raw else BasicTaxon._make(taxon)
+
+
 class ListResult:
+    __slots__ = ("_data", "_taxids")
+
     def __init__(self, jsondata):
-        self._data = json.loads(jsondata)
+        if isinstance(jsondata, dict):
+            self._data = jsondata
+        else:
+            self._data = jsonlib.loads(jsondata)
+        self._taxids = None
 
     def __len__(self):
         return len(self._data)
@@ -135,30 +409,107 @@ class ListResult:
     def __str__(self):
         return json.dumps(self._data, indent=4)
 
+    def __contains__(self, taxid):
+        # int() would accept True as 1 and truncate 9606.5 to 9606, but neither names a taxid
+        if isinstance(taxid, bool) or (isinstance(taxid, float) and not taxid.is_integer()):
+            return False
+        try:
+            return int(taxid) in self.taxids
+        except (TypeError, ValueError):
+            return False
+
     def __iter__(self):
         for taxonstr, taxtree in self._data.items():
-            taxid, rank, name = taxonstr.replace("[", "]").split("]")
-            taxon = BasicTaxon(taxid=int(taxid.strip()), rank=rank, name=name.strip())
+            taxon = _parse_taxon(taxonstr)
             if len(taxtree) > 0:
-                taxtree = ListResult(json.dumps(taxtree))
+                taxtree = ListResult(taxtree)
             yield taxon, taxtree
 
-    def _do_traverse(self, tree):
-        for taxonstr, taxtree in tree.items():
-            taxid, rank, name = taxonstr.replace("[", "]").split("]")
-            taxon = BasicTaxon(taxid=int(taxid.strip()), rank=rank, name=name.strip())
-            yield taxon
+    def _do_traverse(self, tree, raw=False):
+        # Depth-first, pre-order walk using an explicit stack of iterators rather than recursion,
+        # so deep trees need neither a generator frame per level nor Python's recursion limit
+        stack = [iter(tree.items())]
+        while stack:
+            try:
+                taxonstr, taxtree = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                continue
+            yield _parse_taxon(taxonstr, raw)
             if len(taxtree) > 0:
-                for subtaxon in self._do_traverse(taxtree):
-                    yield subtaxon
+                stack.append(iter(taxtree.items()))
 
     @property
     def traverse(self):
         for taxon in self._do_traverse(self._data):
             yield taxon
 
+    @property
+    def traverse_raw(self):
+        """Walk the tree like `traverse`, but yield each taxon as a plain `(taxid, rank, name)` tuple
+
+        Skipping the `BasicTaxon` wrapper makes this faster for code that only counts or filters
+        taxa; to test whether a taxid occurs in the tree, use `taxid in result` instead.
+        """
+        for taxon in self._do_traverse(self._data, raw=True):
+            yield taxon
+
+    @property
+    def taxids(self):
+        """The set of taxids of all taxa in the tree, at any depth
+
+        Computed on first access; `taxid in result` tests membership in this set.
+        """
+        if self._taxids is None:
+            taxids = set()
+            stack = [self._data]
+            while stack:
+                for taxonstr, taxtree in stack.pop().items():
+                    taxids.add(int(taxonstr.partition(" ")[0]))
+                    if len(taxtree) > 0:
+                        stack.append(taxtree)
+            self._taxids = frozenset(taxids)
+        return self._taxids
+
+    def to_frame(self):
+        """Tabulate all taxa in the tree, in the same order as `traverse`
+
+        Returns
+        -------
+        DataFrame
+            One row per taxon, with columns `TaxID`, `Rank`, `Name`, and `ParentTaxID`; the
+            `ParentTaxID` of each top-level taxon is missing (`<NA>`)
+        """
+        import pandas as pd
+
+        parents, taxids, ranks, names = [], [], [], []
+        # Same walk as `_do_traverse`, but with each parent's taxid kept alongside its children
+        stack = [(None, iter(self._data.items()))]
+        while stack:
+            parent, children = stack[-1]
+            try:
+                taxonstr, taxtree = next(children)
+            except StopIteration:
+                stack.pop()
+                continue
+            taxon = _parse_taxon(taxonstr)
+            parents.append(parent)
+            taxids.append(taxon.taxid)
+            ranks.append(taxon.rank)
+            names.append(taxon.name)
+            if len(taxtree) > 0:
+                stack.append((taxon.taxid, iter(taxtree.items())))
+        return pd.DataFrame(
+            {
+                "TaxID": pd.array(taxids, dtype=pd.UInt32Dtype()),
+                "Rank": pd.Categorical(ranks),
+                "Name": pd.array(names, dtype=pd.StringDtype()),
+                "ParentTaxID": pd.array(parents, dtype=pd.UInt32Dtype()),
+            }
+        )
+
 
-def list(ids, raw=False, threads=None, data_dir=None, debug=False):
+def list(ids, raw=False, threads=None, data_dir=None, batch_size=10000, workers=1, debug=False):
     """list taxon tree of given taxids
 
     Parameters
@@ -175,6 +526,14 @@ def list(ids, raw=False, threads=None, data_dir=None, debug=False):
     data_dir : str, default None
         Specify the location of the NCBI taxonomy `.dmp` files; by default, taxonkit searches in
         `~/.taxonkit/`
+    batch_size : int, default 10000
+        The taxids are passed to taxonkit on the command line, which the operating system limits in
+        length; larger queries are split into batches of at most this many taxids, one `taxonkit
+        list` call per batch, and the results are merged
+    workers : int, default 1
+        Run up to this many `taxonkit list` batches concurrently, splitting the taxids into smaller
+        batches if needed so that every worker gets a share; each process loads the taxonomy
+        separately, so this only pays off for very large queries
     debug : bool, default False
         Print debugging output, e.g., system calls to `taxonkit`
 
@@ -200,86 +559,51 @@ def list(ids, raw=False, threads=None, data_dir=None, debug=False):
     >>> pytaxonkit.list([9605], raw=True)
     {'9605 [genus] Homo': {'9606 [species] Homo sapiens': {'63221 [subspecies] Homo sapiens neanderthalensis': {}, "741158 [subspecies] Homo sapiens subsp. 'Denisova'": {}}, '1425170 [species] Homo heidelbergensis': {}, '2665952 [no rank] environmental samples': {'2665953 [species] Homo sapiens environmental sample': {}}, '2813598 [no rank] unclassified Homo': {'2813599 [species] Homo sp.': {}}}}
     """  # noqa: E501
-    idlist = ",".join(map(str, ids))
-    if idlist == "":
+    if workers > 1:
+        if hasattr(ids, "tolist"):
+            ids = ids.tolist()
+        ids = pylist(ids)
+        batch_size = min(batch_size, max(-(-len(ids) // workers), 1))
+    batches = _id_batches(ids, batch_size)
+    if batches is None:
         warn("No input for pytaxonkit.list", UserWarning)
         return
-    arglist = ["taxonkit", "list", "--json", "--show-name", "--show-rank", "--ids", idlist]
+    extraargs = []
+    threads = validate_threads(threads)
     if threads:
-        arglist.extend(("--threads", validate_threads(threads)))
+        extraargs.extend(("--threads", threads))
     if data_dir:
-        arglist.extend(("--data-dir", validate_data_dir(data_dir)))  # pragma: no cover
-    if debug:
-        log(*arglist)  # pragma: no cover
-    proc = Popen(arglist, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    out, err = proc.communicate()
-    if proc.returncode != 0:
-        raise TaxonKitCLIError(err)  # pragma: no cover
+        extraargs.extend(("--data-dir", validate_data_dir(data_dir)))  # pragma: no cover
+
+    def run(batch):
+        arglist = ["taxonkit", "list", "--json", "--show-name", "--show-rank", "--ids"]
+        arglist.extend((",".join(batch), *extraargs))
+        if debug:
+            log(*arglist)  # pragma: no cover
+        return jsonlib.loads(_run_taxonkit(arglist))
+
+    data = dict()
+    if workers > 1:
+        # Results are merged in batch order, whichever taxonkit process finishes first
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(run, batches):
+                data.update(result)
+    else:
+        for batch in batches:
+            data.update(run(batch))
     if raw:
-        return json.loads(out)
+        return data
     else:
-        return ListResult(out)
-
-
-def test_list_leaves(capsys):
-    result = list([8204, 2468], debug=True)  # Nota bene: `list` here is `pytaxonkit.list`
-    assert len(result) == 2
-    top_level_taxa = [taxon for taxon, tree in result]
-    sub_trees = [tree for taxon, tree in result]
-    assert top_level_taxa == [
-        BasicTaxon(taxid=8204, rank="species", name="Anarhichas lupus"),
-        BasicTaxon(taxid=2468, rank="species", name="Plasmid NR79"),
-    ]
-    assert sub_trees == [{}, {}]
-    out, err = capsys.readouterr()
-    data = "[pytaxonkit::debug] taxonkit list --json --show-name --show-rank --ids 8204,2468"
-    assert err.strip() == data
-
-
-@pytest.mark.parametrize(
-    "taxid,taxon,subtaxon,subsubtaxon",
-    [
-        (
-            83882,
-            BasicTaxon(taxid=83882, rank="genus", name="Apogon"),
-            BasicTaxon(taxid=638272, rank="subgenus", name="Apogon"),
-            BasicTaxon(taxid=308069, rank="species", name="Apogon maculatus"),
-        ),
-        (
-            44568,
-            BasicTaxon(taxid=44568, rank="genus", name="Parasimulium"),
-            BasicTaxon(taxid=61057, rank="subgenus", name="Parasimulium"),
-            BasicTaxon(taxid=61060, rank="species", name="Parasimulium crosskeyi"),
-        ),
-    ],
-)
-def test_list_genera(taxid, taxon, subtaxon, subsubtaxon):
-    result = list([taxid], threads=1)  # Nota bene: `list` here is `pytaxonkit.list`
-    tax, tree = next(iter(result))
-    subtax, subtree = next(iter(tree))
-    subsubtax, subsubtree = next(iter(subtree))
-    assert tax == taxon
-    assert subtax == subtaxon
-    assert subsubtax == subsubtaxon
-    assert subsubtree == {}
-
-
-def test_list_str():
-    result = list(["20019"])
-    with open("sweetleaf.json", "r") as fh:
-        assert str(result) == fh.read().strip()
-
-
-def test_list_empty():
-    with pytest.warns(UserWarning, match="No input for pytaxonkit.list"):
-        result = list([])
-        assert result is None
+        return ListResult(data)
 
 
 # -------------------------------------------------------------------------------------------------
 # taxonkit lineage
 # -------------------------------------------------------------------------------------------------
 
+# Ranks whose prefixes `taxonkit reformat` can override, one `--prefix-*` flag each
+_PREFIX_RANKS = frozenset("kpcofgsStT")
+
 
 def lineage(
     ids,
@@ -289,6 +613,8 @@ def lineage(
     prefix=False,
     pseudo_strain=False,
     fill_missing=False,
+    dedup=True,
+    workers=1,
     debug=False,
     **kwargs,
 ):
@@ -320,6 +646,13 @@ def lineage(
         and not "subspecies" nor "strain"
     fill_missing : bool, default False
         Fill missing rank with lineage information of the next higher rank
+    dedup : bool, default True
+        Query each distinct taxid only once, copying its result into every row where it occurs in
+        `ids`; the result is the same either way, but much faster to compute for highly redundant
+        inputs
+    workers : int, default 1
+        Split the taxids evenly among this many `taxonkit` pipelines run concurrently; each process
+        loads the taxonomy separately, so this only pays off for very large queries
     debug : bool, default False
         Print debugging output, e.g., system calls to `taxonkit`
 
@@ -349,8 +682,13 @@ def lineage(
     1   929505                                                     Clostridiaceae;Clostridium;Clostridium botulinum;      31979;1485;1491;
     2   390333  Lactobacillaceae;Lactobacillus;Lactobacillus delbrueckii;Lactobacillus delbrueckii subsp. bulgaricus  33958;1578;1584;1585
     """  # noqa: E501
-    idlist = "\n".join(map(str, ids))
-    if idlist == "":
+    import pandas as pd
+
+    codes = None
+    if dedup:
+        ids, codes = _dedup_ids(ids)
+    shards = _id_shards(ids, workers)
+    if shards is None:
         warn("No input for pytaxonkit.lineage", UserWarning)
         return
     arglist = [
@@ -362,85 +700,82 @@ def lineage(
         "--show-name",
         "--show-lineage-ranks",
     ]
+    threads = validate_threads(threads)
+    data_dir = validate_data_dir(data_dir) if data_dir else None
     if threads:
-        arglist.extend(("--threads", validate_threads(threads)))
+        arglist.extend(("--threads", threads))
     if data_dir:
-        arglist.extend(("--data-dir", validate_data_dir(data_dir)))  # pragma: no cover
+        arglist.extend(("--data-dir", data_dir))  # pragma: no cover
+    extraargs = []
+    if formatstr:
+        extraargs.extend(("--format", formatstr))
+    if prefix:
+        extraargs.append("--add-prefix")
+    for key, value in kwargs.items():
+        subkey = key[len("prefix_") :]
+        if not key.startswith("prefix_") or subkey not in _PREFIX_RANKS:
+            raise TypeError(f'unexpected keyword argument "{key}"')
+        flag = f"--prefix-{subkey}"
+        extraargs.extend((flag, value))
+    if threads:
+        extraargs.extend(("--threads", threads))
+    if pseudo_strain:
+        extraargs.append("--pseudo-strain")
+    if fill_missing:
+        extraargs.append("--fill-miss-rank")
+    if data_dir:
+        extraargs.extend(("--data-dir", data_dir))  # pragma: no cover
+    reformatargs = [
+        "taxonkit",
+        "reformat",
+        *extraargs,
+        "--lineage-field",
+        "3",
+        "--show-lineage-taxids",
+    ]
     if debug:
         log(*arglist)
-    with NamedTemporaryFile(suffix="-lineage.txt") as lineagefile:
-        proc = Popen(arglist, stdin=PIPE, stdout=lineagefile, stderr=PIPE, universal_newlines=True)
-        out, err = proc.communicate(input=idlist)
-        if proc.returncode != 0:
-            raise TaxonKitCLIError(err)  # pragma: no cover
-        lineagefile.flush()
-        os.fsync(lineagefile.fileno())
-        extraargs = []
-        if formatstr:
-            extraargs.extend(("--format", formatstr))
-        if prefix:
-            extraargs.append("--add-prefix")
-        for key, value in kwargs.items():
-            if key.count("_") != 1:
-                raise TypeError(f'unexpected keyword argument "{key}"')
-            prefix, subkey = key.split("_")
-            if prefix != "prefix" or subkey not in "kpcofgsStT":
-                raise TypeError(f'unexpected keyword argument "{key}"')
-            flag = f"--prefix-{subkey}"
-            extraargs.extend((flag, value))
-        if threads:
-            extraargs.extend(("--threads", validate_threads(threads)))
-        if pseudo_strain:
-            extraargs.append("--pseudo-strain")
-        if fill_missing:
-            extraargs.append("--fill-miss-rank")
-        if data_dir:
-            extraargs.extend(("--data-dir", validate_data_dir(data_dir)))  # pragma: no cover
-        arglist = [
-            "taxonkit",
-            "reformat",
-            *extraargs,
-            "--lineage-field",
-            "3",
-            "--show-lineage-taxids",
-            lineagefile.name,
-        ]
-        if debug:
-            log(*arglist)
-        proc = Popen(arglist, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-        out, err = proc.communicate()
-        if proc.returncode != 0:
-            raise TaxonKitCLIError(err)  # pragma: no cover
-        columnorderin = [
-            "TaxID",
-            "Code",
-            "FullLineage",
-            "FullLineageTaxIDs",
-            "Name",
-            "Rank",
-            "FullLineageRanks",
-            "Lineage",
-            "LineageTaxIDs",
-        ]
-        columnorderout = [
-            "TaxID",
-            "Code",
-            "Name",
-            "Lineage",
-            "LineageTaxIDs",
-            "Rank",
-            "FullLineage",
-            "FullLineageTaxIDs",
-            "FullLineageRanks",
-        ]
-        data = pd.read_csv(
-            StringIO(out), sep="\t", header=None, names=columnorderin, index_col=False
-        )
-        data = data[columnorderout]
-        return data
+        log(*reformatargs)
+    columnorderin = [
+        "TaxID",
+        "Code",
+        "FullLineage",
+        "FullLineageTaxIDs",
+        "Name",
+        "Rank",
+        "FullLineageRanks",
+        "Lineage",
+        "LineageTaxIDs",
+    ]
+    columnorderout = [
+        "TaxID",
+        "Code",
+        "Name",
+        "Lineage",
+        "LineageTaxIDs",
+        "Rank",
+        "FullLineage",
+        "FullLineageTaxIDs",
+        "FullLineageRanks",
+    ]
+    # The text columns are declared so that they are read as text even when every value is missing,
+    # e.g. for unknown taxids. TaxID echoes each query as given, so a non-numeric query must not
+    # break parsing; it and Code are left to inference, which yields int64 whenever every query is
+    # a valid taxid
+    dtypes = {column: str for column in columnorderin if column not in ("TaxID", "Code")}
+    dtypes["Rank"] = "category"
 
+    def run(idlist):
+        with _open_taxonkit(arglist, reformatargs, input=idlist) as stdout:
+            return pd.read_csv(
+                stdout, sep="\t", header=None, names=columnorderin, dtype=dtypes, index_col=False
+            )
 
-def name(ids, data_dir=None, debug=False):
+    data = _collect_frames(run, shards, ids, codes, workers)
+    return data[columnorderout]
+
+
+def name(ids, data_dir=None, dedup=True, workers=1, debug=False):
     """rapid taxon name retrieval
 
     Uses the `--no-lineage` option in `taxonkit lineage` for rapid retrieval of taxon names.
@@ -452,6 +787,13 @@ def name(ids, data_dir=None, debug=False):
     data_dir : str, default None
         Specify the location of the NCBI taxonomy `.dmp` files; by default, taxonkit searches in
         `~/.taxonkit/`
+    dedup : bool, default True
+        Query each distinct taxid only once, copying its result into every row where it occurs in
+        `ids`; the result is the same either way, but much faster to compute for highly redundant
+        inputs
+    workers : int, default 1
+        Split the taxids evenly among this many `taxonkit lineage` processes run concurrently;
+        each process loads the taxonomy separately, so this only pays off for very large queries
     debug : bool, default False
         Print debugging output, e.g., system calls to `taxonkit`
 
@@ -469,8 +811,13 @@ def name(ids, data_dir=None, debug=False):
     1  2216222         Paramyia sp. BIOUG21706-A10
     2   517824  soil bacterium Cipr-S1N-M1LLLSSL-1
     """
-    idlist = "\n".join(map(str, ids)) + "\n"
-    if idlist == "\n":
+    import pandas as pd
+
+    codes = None
+    if dedup:
+        ids, codes = _dedup_ids(ids)
+    shards = _id_shards(ids, workers)
+    if shards is None:
         warn("No input for pytaxonkit.name", UserWarning)
         return
     arglist = ["taxonkit", "lineage", "--show-name", "--no-lineage"]
@@ -478,138 +825,19 @@ def name(ids, data_dir=None, debug=False):
         arglist.extend(("--data-dir", validate_data_dir(data_dir)))  # pragma: no cover
     if debug:
         log(*arglist)
-    proc = Popen(arglist, stdin=PIPE, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    out, err = proc.communicate(input=idlist)
-    data = pd.read_csv(
-        StringIO(out), sep="\t", header=None, names=["TaxID", "Name"], index_col=False
-    )
-    return data
-
-
-def test_lineage(capsys):
-    result = lineage(["1082657", "265720", "1191594", "106649", "2868953"], debug=True)
-    assert result.TaxID.equals(pd.Series([1082657, 265720, 1191594, 106649, 2868953]))
-    assert result.Code.equals(pd.Series([1082657, 265720, 1191594, 106649, 2868953]))
-    assert result.Lineage.equals(
-        pd.Series(
-            [
-                "Eukaryota;Discosea;;Longamoebia;Acanthamoebidae;Acanthamoeba;Acanthamoeba sp. TW95",
-                "Bacteria;Bacteroidota;Bacteroidia;Bacteroidales;Porphyromonadaceae;Porphyromonas;Porphyromonas genomosp. P3",
-                "Eukaryota;Basidiomycota;Agaricomycetes;Russulales;Russulaceae;Russula;Russula carmesina",
-                "Bacteria;Pseudomonadota;Gammaproteobacteria;Moraxellales;Moraxellaceae;Acinetobacter;Acinetobacter guillouiae",
-                "Eukaryota;Arthropoda;Insecta;Hemiptera;Lygaeidae;Lygaeosoma;Lygaeosoma sardeum",
-            ]
-        )
-    )
-    assert result.LineageTaxIDs.equals(
-        pd.Series(
-            [
-                "2759;555280;;1485168;33677;5754;1082657",
-                "2;976;200643;171549;171551;836;265720",
-                "2759;5204;155619;452342;5401;5402;1191593",
-                "2;1224;1236;2887326;468;469;106649",
-                "2759;6656;50557;7524;7533;2868952;2868953",
-            ]
-        )
-    )
-    assert result.Rank.equals(pd.Series(["species", "species", "varietas", "species", "species"]))
-
-    out, err = capsys.readouterr()
-    assert "taxonkit lineage --show-lineage-taxids --show-rank --show-status-code" in err
-    assert "taxonkit reformat --lineage-field 3 --show-lineage-taxids" in err
-
-
-def test_lineage_single_taxid():
-    result = lineage([128370])
-    assert result.TaxID.iloc[0] == 128370
-
-
-def test_lineage_threads():
-    result = lineage(["200643"], threads=1)
-    assert result.FullLineageRanks.iloc[0] == "no rank;superkingdom;clade;clade;phylum;class"
-    expected = "cellular organisms;Bacteria;FCB group;Bacteroidota/Chlorobiota group;Bacteroidota;Bacteroidia"
-    assert result.FullLineage.iloc[0] == expected
-
-
-def test_lineage_name():
-    result = lineage(["526061"])
-    assert result.Name.iloc[0] == "Henosepilachna sp. AGBA-2008"
-
-
-def test_lineage_prefix():
-    result = lineage([64191], prefix=True)
-    obs_out = result.Lineage.iloc[0]
-    exp_out = "k__Bacteria;p__Pseudomonadota;c__Alphaproteobacteria;o__;f__;g__;s__magnetic proteobacterium strain rj53"
-    assert exp_out == obs_out
-    result = lineage(["229933"], prefix=True, prefix_p="PHYLUM:", prefix_c="CLASS:")
-    obs_out = result.Lineage.iloc[0]
-    exp_out = "k__Bacteria;PHYLUM:Pseudomonadota;CLASS:Alphaproteobacteria;o__Rickettsiales;f__Anaplasmataceae;g__Wolbachia;s__Wolbachia endosymbiont of Togo hemipterus (strain 1)"
-    assert exp_out == obs_out
-
-
-def test_lineage_prefix_no_effect():
-    result = lineage([325064], prefix_o="ORDER:")
-    obs_out = result.Lineage.iloc[0]
-    exp_out = (
-        "Eukaryota;Discosea;Flabellinia;;Vannellidae;Platyamoeba;Platyamoeba sp. strain AFSM6/I"
-    )
-    assert exp_out == obs_out
-
-
-def test_lineage_bad_prefix():
-    with pytest.raises(TypeError, match=r'unexpected keyword argument "prefix_bOguSrANk"'):
-        lineage([325064], prefix_bOguSrANk="BOGUS:")
-    with pytest.raises(TypeError, match=r'unexpected keyword argument "prefix_g_s"'):
-        lineage([325064], prefix_g_s="GS:")
-    with pytest.raises(TypeError, match=r'unexpected keyword argument "breakfast_sausage"'):
-        lineage([325064], breakfast_sausage="YUM")
-
-
-def test_lineage_pseudo_strain():
-    result = lineage(
-        [36827],
-        formatstr="{k};{p};{c};{o};{f};{g};{s};{t}",
-        fill_missing=True,
-        pseudo_strain=True,
-        prefix=True,
-    )
-    obs_out = result.Lineage.iloc[0]
-    exp_out = "k__Bacteria;p__Bacillota;c__Clostridia;o__Eubacteriales;f__Clostridiaceae;g__Clostridium;s__Clostridium botulinum;t__Clostridium botulinum B"
-    assert exp_out == obs_out
-
-
-def test_name_debug(capsys):
-    result = name([207661, 1353792, 1597281], debug=True)
-    assert result.Name.equals(
-        pd.Series(
-            [
-                "Ahnfeltiopsis concinna",
-                "Picobirnavirus turkey/USA-1512/2010",
-                "Isopoda sp. NZAC 03013534",
-            ]
-        )
-    )
-    out, err = capsys.readouterr()
-    assert "taxonkit lineage --show-name --no-lineage" in err
 
+    def run(idlist):
+        with _open_taxonkit(arglist, input=idlist) as stdout:
+            return pd.read_csv(
+                stdout,
+                sep="\t",
+                header=None,
+                names=["TaxID", "Name"],
+                dtype={"Name": str},
+                index_col=False,
+            )
 
-def test_name_regression():
-    result = name([6])
-    print(result)
-    assert len(result) == 1
-    assert result.Name[0] == "Azorhizobium"
-
-
-def test_lineage_empty():
-    with pytest.warns(UserWarning, match="No input for pytaxonkit.lineage"):
-        result = lineage([])
-        assert result is None
-
-
-def test_name_empty():
-    with pytest.warns(UserWarning, match="No input for pytaxonkit.name"):
-        result = name([])
-        assert result is None
+    return _collect_frames(run, shards, ids, codes, workers)
 
 
 # -------------------------------------------------------------------------------------------------
@@ -617,7 +845,7 @@ def test_name_empty():
 # -------------------------------------------------------------------------------------------------
 
 
-def name2taxid(names, sciname=False, threads=None, data_dir=None, debug=False):
+def name2taxid(names, sciname=False, threads=None, data_dir=None, workers=1, debug=False):
     """query taxid by taxon scientific name
 
     Parameters
@@ -632,6 +860,9 @@ def name2taxid(names, sciname=False, threads=None, data_dir=None, debug=False):
     data_dir : str, default None
         Specify the location of the NCBI taxonomy `.dmp` files; by default, taxonkit searches in
         `~/.taxonkit/`
+    workers : int, default 1
+        Split the names evenly among this many `taxonkit name2taxid` processes run concurrently;
+        each process loads the taxonomy separately, so this only pays off for very large queries
     debug : bool, default False
         Print debugging output, e.g., system calls to `taxonkit`
 
@@ -651,58 +882,39 @@ def name2taxid(names, sciname=False, threads=None, data_dir=None, debug=False):
     2             Rexia erectus  262902  species
     >>> pytaxonkit.name2taxid(names, sciname=True)
                            Name  TaxID  Rank
-    0  Phyllobolus spinuliferus   <NA>  <NA>
-    1  Alteromonas putrefaciens   <NA>  <NA>
-    2             Rexia erectus   <NA>  <NA>
+    0  Phyllobolus spinuliferus   <NA>   NaN
+    1  Alteromonas putrefaciens   <NA>   NaN
+    2             Rexia erectus   <NA>   NaN
     """
-    namelist = "\n".join(map(str, names))
-    if namelist == "":
+    import pandas as pd
+
+    shards = _id_shards(names, workers)
+    if shards is None:
         warn("No input for pytaxonkit.name2taxid", UserWarning)
         return
     arglist = ["taxonkit", "name2taxid", "--show-rank"]
     if sciname:
         arglist.append("--sci-name")
+    threads = validate_threads(threads)
     if threads:
-        arglist.extend(("--threads", validate_threads(threads)))
+        arglist.extend(("--threads", threads))
     if data_dir:
         arglist.extend(("--data-dir", validate_data_dir(data_dir)))  # pragma: no cover
     if debug:
         log(*arglist)  # pragma: no cover
-    proc = Popen(arglist, stdin=PIPE, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    out, err = proc.communicate(input=namelist)
-    if proc.returncode != 0:
-        raise TaxonKitCLIError(err)  # pragma: no cover
     columns = {
-        "Name": StringDtype(),
-        "TaxID": UInt32Dtype(),
-        "Rank": StringDtype(),
+        "Name": pd.StringDtype(),
+        "TaxID": pd.UInt32Dtype(),
+        "Rank": "category",
     }
-    data = pd.read_csv(
-        StringIO(out), sep="\t", header=None, names=columns, dtype=columns, index_col=False
-    )
-    return data
-
-
-def test_name2taxid(capsys):
-    result = name2taxid(["Chaetocerotales", "Diptera", "Rickettsiales", "Hypocreales"], debug=True)
-    taxids = pd.Series([265576, 7147, 766, 5125], dtype=UInt32Dtype())
-    ranks = pd.Series(["order", "order", "order", "order"], dtype=StringDtype())
-    assert result.TaxID.equals(taxids)
-    assert result.Rank.equals(ranks)
 
-    out, err = capsys.readouterr()
-    assert "[pytaxonkit::debug] taxonkit name2taxid --show-rank" in err
+    def run(namelist):
+        with _open_taxonkit(arglist, input=namelist) as stdout:
+            return pd.read_csv(
+                stdout, sep="\t", header=None, names=columns, dtype=columns, index_col=False
+            )
 
-
-def test_name2taxid_threads():
-    result = name2taxid(["FCB group"], threads="1")
-    assert str(result) == "        Name    TaxID   Rank\n0  FCB group  1783270  clade"
-
-
-def test_name2taxid_empty():
-    with pytest.warns(UserWarning, match="No input for pytaxonkit.name2taxid"):
-        result = name2taxid([])
-        assert result is None
+    return _concat_frames(_map_shards(run, shards))
 
 
 # -------------------------------------------------------------------------------------------------
@@ -771,13 +983,14 @@ def filter(
     """
     if higher_than is not None and lower_than is not None:
         raise ValueError('cannot specify "higher_than" and "lower_than" simultaneously')
-    idlist = "\n".join(map(str, ids))
-    if idlist == "":
+    idlist = _id_lines(ids)
+    if idlist is None:
         warn("No input for pytaxonkit.filter", UserWarning)
         return
     arglist = ["taxonkit", "filter"]
+    threads = validate_threads(threads)
     if threads:
-        arglist.extend(("--threads", validate_threads(threads)))
+        arglist.extend(("--threads", threads))
     if equal_to:
         if isinstance(equal_to, (pylist, tuple)):
             equal_to = ",".join(equal_to)
@@ -800,10 +1013,8 @@ def filter(
         arglist.extend(["--rank-file", rank_file])
     if debug:
         log(*arglist)
-    proc = Popen(arglist, stdin=PIPE, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    out, err = proc.communicate(input=idlist)
-    data = pd.read_csv(StringIO(out), header=None, names=["TaxID"], index_col=False)
-    return pylist(data.TaxID)
+    with _open_taxonkit(arglist, input=idlist) as stdout:
+        return [int(line) for line in stdout if not line.isspace()]
 
 
 def list_ranks(rank_file=None, debug=False):
@@ -832,10 +1043,9 @@ def list_ranks(rank_file=None, debug=False):
         arglist.extend(["--rank-file", rank_file])
     if debug:
         log(*arglist)
-    proc = Popen(arglist, stdin=PIPE, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    out, err = proc.communicate(input="")
+    out = _run_taxonkit_cached(tuple(arglist))
     ranks = pylist()
-    for line in out.strip().split():
+    for line in out.split():
         rankvalue = line.split(",") if "," in line else line
         ranks.append(rankvalue)
     return ranks
@@ -867,227 +1077,8 @@ def list_ranks_db(rank_file=None, debug=False):
         arglist.extend(["--rank-file", rank_file])
     if debug:
         log(*arglist)
-    proc = Popen(arglist, stdin=PIPE, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    out, err = proc.communicate(input="")
-    data = pd.read_csv(StringIO(out), header=None, names=["Rank"], index_col=False)
-    return pylist(data.Rank)
-
-
-@pytest.mark.parametrize(
-    "discard_norank,exp_result",
-    [
-        (True, [2759, 33208, 6656, 6960, 50557, 7496, 33340, 33392, 7399]),
-        (
-            False,
-            [
-                131567,
-                2759,
-                33154,
-                33208,
-                6072,
-                33213,
-                33317,
-                1206794,
-                88770,
-                6656,
-                197563,
-                197562,
-                6960,
-                50557,
-                85512,
-                7496,
-                33340,
-                33392,
-                7399,
-            ],
-        ),
-    ],
-)
-def test_filter_higher_than(discard_norank, exp_result):
-    taxids = [
-        131567,
-        2759,
-        33154,
-        33208,
-        6072,
-        33213,
-        33317,
-        1206794,
-        88770,
-        6656,
-        197563,
-        197562,
-        6960,
-        50557,
-        85512,
-        7496,
-        33340,
-        33392,
-        7399,
-        7400,
-        7434,
-        34735,
-        7458,
-        70987,
-        83322,
-        481579,
-        2056706,
-        599582,
-    ]
-    obs_result = filter(
-        taxids, threads=1, higher_than="order", equal_to="order", discard_norank=discard_norank
-    )
-    assert obs_result == exp_result
-
-
-def test_filter_lower_than(capsys):
-    taxids = [
-        131567,
-        2759,
-        33154,
-        33208,
-        6072,
-        33213,
-        33317,
-        1206794,
-        88770,
-        6656,
-        197563,
-        197562,
-        6960,
-        50557,
-        85512,
-        7496,
-        33340,
-        33392,
-        7041,
-        41071,
-        535382,
-        41073,
-        706613,
-        586004,
-        87479,
-        412111,
-    ]
-    obs_result = filter(taxids, lower_than="family", discard_norank=True, debug=True)
-    exp_result = [706613, 586004, 87479, 412111]
-    assert obs_result == exp_result
-    terminal = capsys.readouterr()
-    assert "taxonkit filter --lower-than family" in terminal.err
-
-
-@pytest.mark.parametrize(
-    "discard_norank,exp_result",
-    [
-        (True, [6656, 87479]),
-        (
-            False,
-            [
-                131567,
-                33154,
-                6072,
-                33213,
-                33317,
-                1206794,
-                88770,
-                6656,
-                197563,
-                197562,
-                85512,
-                87479,
-            ],
-        ),
-    ],
-)
-def test_filter_equal_to_multi(capsys, discard_norank, exp_result):
-    taxids = [
-        131567,
-        2759,
-        33154,
-        33208,
-        6072,
-        33213,
-        33317,
-        1206794,
-        88770,
-        6656,
-        197563,
-        197562,
-        6960,
-        50557,
-        85512,
-        7496,
-        33340,
-        33392,
-        7041,
-        41071,
-        535382,
-        41073,
-        706613,
-        586004,
-        87479,
-        412111,
-    ]
-    obs_result = filter(
-        taxids, threads=1, equal_to=["phylum", "genus"], debug=True, discard_norank=discard_norank
-    )
-    assert obs_result == exp_result
-    terminal = capsys.readouterr()
-    assert "--equal-to phylum,genus" in terminal.err
-
-
-def test_filter_higher_lower_conflict():
-    message = r'cannot specify "higher_than" and "lower_than" simultaneously'
-    with pytest.raises(ValueError, match=message):
-        filter([42], discard_norank=True, higher_than="genus", lower_than="genus")
-
-
-def test_filter_save_predictable():
-    taxids = [
-        131567,
-        2,
-        1224,
-        1236,
-        91347,
-        543,
-        561,
-        562,
-        2605619,
-        10239,
-        2731341,
-        2731360,
-        2731618,
-        2731619,
-        2788787,
-        1327037,
-    ]
-    obs_result = filter(
-        taxids, threads=1, lower_than="species", equal_to="species", save_predictable=True
-    )
-    exp_result = [562, 2605619, 1327037]
-    assert obs_result == exp_result
-
-
-def test_list_ranks(capsys):
-    ranks = list_ranks(debug=True)
-    multiranks = [r for r in ranks if isinstance(r, pylist)]
-    assert len(ranks) == 71
-    assert len(multiranks) == 17
-    terminal = capsys.readouterr()
-    assert "taxonkit filter --list-order" in terminal.err
-
-
-def test_list_ranks_db(capsys):
-    ranks = list_ranks_db(debug=True)
-    assert len(ranks) == 44
-    terminal = capsys.readouterr()
-    assert "taxonkit filter --list-ranks" in terminal.err
-
-
-def test_filter_empty():
-    with pytest.warns(UserWarning, match="No input for pytaxonkit.filter"):
-        result = filter([])
-        assert result is None
+    out = _run_taxonkit_cached(tuple(arglist))
+    return [rank for rank in out.splitlines() if rank]
 
 
 # -------------------------------------------------------------------------------------------------
@@ -1103,6 +1094,7 @@ def lca(
     keep_invalid=False,
     threads=None,
     data_dir=None,
+    workers=1,
     debug=False,
 ):
     """compute lowest common ancestor (LCA) for taxids
@@ -1125,6 +1117,10 @@ def lca(
     data_dir : str, default None
         Specify the location of the NCBI taxonomy `.dmp` files; by default, taxonkit searches in
         `~/.taxonkit/`
+    workers : int, default 1
+        When `multi=True`, split the queries evenly among this many `taxonkit lca` processes run
+        concurrently; each process loads the taxonomy separately and uses its own `threads`, so
+        this only pays off for very large batches of queries
     debug : bool, default False
         Print debugging output, e.g., system calls to `taxonkit`
 
@@ -1142,10 +1138,13 @@ def lca(
     [9605, 9606]
     """
     if multi:
-        idstring = "\n".join([" ".join(map(str, sublist)) for sublist in ids])
+        queries = [_join_ids(sublist, " ") for sublist in ids]
+        shards = _id_shards(queries, workers)
+        empty = shards is None
     else:
-        idstring = " ".join(map(str, ids))
-    if idstring == "":
+        idstring = _join_ids(ids, " ")
+        empty = idstring == ""
+    if empty:
         warn("No input for pytaxonkit.lca", UserWarning)
         return
     arglist = ["taxonkit", "lca"]
@@ -1155,87 +1154,40 @@ def lca(
         arglist.append("--skip-unfound")
     if keep_invalid:
         arglist.append("--keep-invalid")
+    threads = validate_threads(threads)
     if threads:
-        arglist.extend(("--threads", validate_threads(threads)))
+        arglist.extend(("--threads", threads))
     if data_dir:
         arglist.extend(("--data-dir", validate_data_dir(data_dir)))  # pragma: no cover
     if debug:
         log(*arglist)
-    proc = Popen(arglist, stdin=PIPE, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    out, err = proc.communicate(input=idstring)
-    if proc.returncode != 0:
-        raise TaxonKitCLIError(err)  # pragma: no cover
-    if out.strip() == "":
-        if multi:
-            return [None] * len(ids)
-        else:
-            return None
-    results = []
-    for line in out.strip().split("\n"):
-        queries, lcataxid = line.split("\t")
-        results.append(int(lcataxid))
-    if multi:
-        return results
-    else:
-        assert len(results) == 1
-        return results[0]
-
-
-def test_lca_deleted():
-    assert lca([1, 2, 3]) == 0
-    assert lca([1, 2, 3], skip_deleted=True, threads=1) == 1
-
-
-def test_lca_unfound(capsys):
-    assert lca([61021, 61022, 11111111]) == 0
-    assert lca([61021, 61022, 11111111], skip_unfound=True, debug=True) == 2628496
-    terminal = capsys.readouterr()
-    assert "taxonkit lca --skip-unfound" in terminal.err
-
-
-def test_lca_keep_invalid_single(capsys):
-    assert lca([11111111], skip_deleted=True, skip_unfound=True) is None
-    assert lca([22222222], skip_deleted=True, skip_unfound=True) is None
-    assert lca([11111111], skip_deleted=True, skip_unfound=True, keep_invalid=True) == 0
-    result = lca(
-        [11111111, 22222222],
-        skip_deleted=True,
-        skip_unfound=True,
-        keep_invalid=True,
-        debug=True,
-    )
-    assert result == 0
-    terminal = capsys.readouterr()
-    assert "taxonkit lca --skip-deleted --skip-unfound --keep-invalid" in terminal.err
-
-
-def test_lca_keep_invalid_multi():
-    query = [
-        [743375],
-        [123456789],
-        [987654321],
-        [743375, 123456789],
-        [743375, 987654321],
-        [123456789, 987654321],
-    ]
-    observed = lca(query, skip_deleted=True, skip_unfound=True, keep_invalid=True, multi=True)
-    expected = [743375, 0, 0, 743375, 743375, 0]
-    assert expected == observed
-
-
-@pytest.mark.parametrize(
-    "domulti, ids,result",
-    [
-        (False, [775536, 2238728, 1121123211234321], None),
-        (True, [[1766280, 406491, 2568889], [11111111111, 20487, 760325]], [None, None]),
-    ],
-)
-def test_lca_all_missing(ids, domulti, result):
-    assert lca(ids, multi=domulti, skip_deleted=True, skip_unfound=True) == result
-
-
-@pytest.mark.parametrize("multi", [True, False])
-def test_lca_empty(multi):
-    with pytest.warns(UserWarning, match="No input for pytaxonkit.lca"):
-        result = lca([], multi=multi)
-        assert result is None
+    if not multi:
+        # The LCA depends neither on the order of the taxids nor on duplicates, so equivalent
+        # queries are normalized to share a cached result
+        idstring = " ".join(sorted(set(idstring.split())))
+        return _lca_single(tuple(arglist), idstring)
+
+    def run(querylist):
+        with _open_taxonkit(arglist, input=querylist) as stdout:
+            return _parse_lca(stdout)
+
+    results = [taxid for shard in _map_shards(run, shards) for taxid in shard]
+    if not results:
+        return [None] * len(queries)
+    return results
+
+
+def _parse_lca(lines):
+    # Each line holds the space-separated query taxids, a tab, and the LCA taxid
+    return [int(line.rpartition(b"\t")[2]) for line in lines if not line.isspace()]
+
+
+@lru_cache(maxsize=65536)
+def _lca_single(arglist, idstring):
+    with _open_taxonkit(pylist(arglist), input=idstring) as stdout:
+        # A single query produces at most one line of output, so there is nothing to iterate over
+        line = stdout.read().strip()
+    if not line:
+        return None
+    assert b"\n" not in line
+    return int(line.rpartition(b"\t")[2])
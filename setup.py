@@ -59,8 +59,8 @@ setup(
     author="Daniel Standage",
     author_email="daniel.standage@nbacc.dhs.gov",
     py_modules=["pytaxonkit", "_version"],
-    python_requires=">=3.6",
-    install_requires=["pytest>=5.4"],
+    python_requires=">=3.7",
+    install_requires=["pandas>=1.0"],
     classifiers=[
         "Environment :: Console",
         "Framework :: IPython",
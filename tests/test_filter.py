@@ -0,0 +1,275 @@
+# -------------------------------------------------------------------------------------------------
+# Copyright (c) 2020, Battelle National Biodefense Institute.
+#
+# This file is part of pytaxonkit (http://github.com/bioforensics/pytaxonkit)
+# and is licensed under the BSD license.
+#
+#
+# This Software was prepared for the Department of Homeland Security
+# (DHS) by the Battelle National Biodefense Institute, LLC (BNBI) as
+# part of contract HSHQDC-15-C-00064 to manage and operate the National
+# Biodefense Analysis and Countermeasures Center (NBACC), a Federally
+# Funded Research and Development Center.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# -------------------------------------------------------------------------------------------------
+
+
+import pandas as pd
+import pytaxonkit
+import pytest
+
+
+@pytest.mark.parametrize(
+    "discard_norank,exp_result",
+    [
+        (True, [2759, 33208, 6656, 6960, 50557, 7496, 33340, 33392, 7399]),
+        (
+            False,
+            [
+                131567,
+                2759,
+                33154,
+                33208,
+                6072,
+                33213,
+                33317,
+                1206794,
+                88770,
+                6656,
+                197563,
+                197562,
+                6960,
+                50557,
+                85512,
+                7496,
+                33340,
+                33392,
+                7399,
+            ],
+        ),
+    ],
+)
+def test_filter_higher_than(discard_norank, exp_result):
+    taxids = [
+        131567,
+        2759,
+        33154,
+        33208,
+        6072,
+        33213,
+        33317,
+        1206794,
+        88770,
+        6656,
+        197563,
+        197562,
+        6960,
+        50557,
+        85512,
+        7496,
+        33340,
+        33392,
+        7399,
+        7400,
+        7434,
+        34735,
+        7458,
+        70987,
+        83322,
+        481579,
+        2056706,
+        599582,
+    ]
+    obs_result = pytaxonkit.filter(
+        taxids, threads=1, higher_than="order", equal_to="order", discard_norank=discard_norank
+    )
+    assert obs_result == exp_result
+
+
+def test_filter_lower_than(capsys):
+    taxids = [
+        131567,
+        2759,
+        33154,
+        33208,
+        6072,
+        33213,
+        33317,
+        1206794,
+        88770,
+        6656,
+        197563,
+        197562,
+        6960,
+        50557,
+        85512,
+        7496,
+        33340,
+        33392,
+        7041,
+        41071,
+        535382,
+        41073,
+        706613,
+        586004,
+        87479,
+        412111,
+    ]
+    obs_result = pytaxonkit.filter(taxids, lower_than="family", discard_norank=True, debug=True)
+    exp_result = [706613, 586004, 87479, 412111]
+    assert obs_result == exp_result
+    terminal = capsys.readouterr()
+    assert "taxonkit filter --lower-than family" in terminal.err
+
+
+@pytest.mark.parametrize(
+    "discard_norank,exp_result",
+    [
+        (True, [6656, 87479]),
+        (
+            False,
+            [
+                131567,
+                33154,
+                6072,
+                33213,
+                33317,
+                1206794,
+                88770,
+                6656,
+                197563,
+                197562,
+                85512,
+                87479,
+            ],
+        ),
+    ],
+)
+def test_filter_equal_to_multi(capsys, discard_norank, exp_result):
+    taxids = [
+        131567,
+        2759,
+        33154,
+        33208,
+        6072,
+        33213,
+        33317,
+        1206794,
+        88770,
+        6656,
+        197563,
+        197562,
+        6960,
+        50557,
+        85512,
+        7496,
+        33340,
+        33392,
+        7041,
+        41071,
+        535382,
+        41073,
+        706613,
+        586004,
+        87479,
+        412111,
+    ]
+    obs_result = pytaxonkit.filter(
+        taxids, threads=1, equal_to=["phylum", "genus"], debug=True, discard_norank=discard_norank
+    )
+    assert obs_result == exp_result
+    terminal = capsys.readouterr()
+    assert "--equal-to phylum,genus" in terminal.err
+
+
+def test_filter_higher_lower_conflict():
+    message = r'cannot specify "higher_than" and "lower_than" simultaneously'
+    with pytest.raises(ValueError, match=message):
+        pytaxonkit.filter([42], discard_norank=True, higher_than="genus", lower_than="genus")
+
+
+def test_filter_save_predictable():
+    taxids = [
+        131567,
+        2,
+        1224,
+        1236,
+        91347,
+        543,
+        561,
+        562,
+        2605619,
+        10239,
+        2731341,
+        2731360,
+        2731618,
+        2731619,
+        2788787,
+        1327037,
+    ]
+    obs_result = pytaxonkit.filter(
+        taxids, threads=1, lower_than="species", equal_to="species", save_predictable=True
+    )
+    exp_result = [562, 2605619, 1327037]
+    assert obs_result == exp_result
+
+
+def test_filter_series():
+    assert pytaxonkit.filter(pd.Series([9605, 9606]), equal_to="genus") == [9605]
+
+
+def test_list_ranks(capsys):
+    ranks = pytaxonkit.list_ranks(debug=True)
+    multiranks = [r for r in ranks if isinstance(r, list)]
+    assert len(ranks) == 71
+    assert len(multiranks) == 17
+    terminal = capsys.readouterr()
+    assert "taxonkit filter --list-order" in terminal.err
+
+
+def test_list_ranks_cache():
+    pytaxonkit.clear_caches()
+    ranks = pytaxonkit.list_ranks()
+    ranks[1].append("kingdom")
+    ranks.append("species")
+    assert pytaxonkit.list_ranks() != ranks
+    assert pytaxonkit._run_taxonkit_cached.cache_info().hits == 1
+
+
+def test_list_ranks_db(capsys):
+    ranks = pytaxonkit.list_ranks_db(debug=True)
+    assert len(ranks) == 44
+    terminal = capsys.readouterr()
+    assert "taxonkit filter --list-ranks" in terminal.err
+
+
+def test_filter_empty():
+    with pytest.warns(UserWarning, match="No input for pytaxonkit.filter"):
+        result = pytaxonkit.filter([])
+        assert result is None
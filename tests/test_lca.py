@@ -0,0 +1,130 @@
+# -------------------------------------------------------------------------------------------------
+# Copyright (c) 2020, Battelle National Biodefense Institute.
+#
+# This file is part of pytaxonkit (http://github.com/bioforensics/pytaxonkit)
+# and is licensed under the BSD license.
+#
+#
+# This Software was prepared for the Department of Homeland Security
+# (DHS) by the Battelle National Biodefense Institute, LLC (BNBI) as
+# part of contract HSHQDC-15-C-00064 to manage and operate the National
+# Biodefense Analysis and Countermeasures Center (NBACC), a Federally
+# Funded Research and Development Center.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# -------------------------------------------------------------------------------------------------
+
+
+import numpy as np
+import pytaxonkit
+import pytest
+
+
+def test_lca_deleted():
+    assert pytaxonkit.lca([1, 2, 3]) == 0
+    assert pytaxonkit.lca([1, 2, 3], skip_deleted=True, threads=1) == 1
+
+
+def test_lca_unfound(capsys):
+    assert pytaxonkit.lca([61021, 61022, 11111111]) == 0
+    assert pytaxonkit.lca([61021, 61022, 11111111], skip_unfound=True, debug=True) == 2628496
+    terminal = capsys.readouterr()
+    assert "taxonkit lca --skip-unfound" in terminal.err
+
+
+def test_lca_keep_invalid_single(capsys):
+    assert pytaxonkit.lca([11111111], skip_deleted=True, skip_unfound=True) is None
+    assert pytaxonkit.lca([22222222], skip_deleted=True, skip_unfound=True) is None
+    assert pytaxonkit.lca([11111111], skip_deleted=True, skip_unfound=True, keep_invalid=True) == 0
+    result = pytaxonkit.lca(
+        [11111111, 22222222],
+        skip_deleted=True,
+        skip_unfound=True,
+        keep_invalid=True,
+        debug=True,
+    )
+    assert result == 0
+    terminal = capsys.readouterr()
+    assert "taxonkit lca --skip-deleted --skip-unfound --keep-invalid" in terminal.err
+
+
+def test_lca_cache():
+    pytaxonkit.clear_caches()
+    assert pytaxonkit.lca([239934, 239935, 349741]) == 239934
+    assert pytaxonkit.lca([349741, "239935", 239934, 239934]) == 239934
+    info = pytaxonkit._lca_single.cache_info()
+    assert info.hits == 1 and info.misses == 1
+    pytaxonkit.clear_caches()
+    assert pytaxonkit._lca_single.cache_info().currsize == 0
+
+
+def test_lca_keep_invalid_multi():
+    query = [
+        [743375],
+        [123456789],
+        [987654321],
+        [743375, 123456789],
+        [743375, 987654321],
+        [123456789, 987654321],
+    ]
+    observed = pytaxonkit.lca(
+        query, skip_deleted=True, skip_unfound=True, keep_invalid=True, multi=True
+    )
+    expected = [743375, 0, 0, 743375, 743375, 0]
+    assert expected == observed
+
+
+def test_lca_ndarray():
+    query = np.array([[63221, 2665953], [63221, 741158]])
+    assert pytaxonkit.lca(query, multi=True) == [9605, 9606]
+    assert pytaxonkit.lca(query[0]) == 9605
+
+
+def test_lca_workers():
+    query = [[63221, 2665953], [63221, 741158], [239934, 239935, 349741]] * 3
+    observed = pytaxonkit.lca(query, multi=True, workers=2)
+    assert observed == [9605, 9606, 239934] * 3
+    assert observed == pytaxonkit.lca(query, multi=True)
+
+
+@pytest.mark.parametrize(
+    "domulti, ids,result",
+    [
+        (False, [775536, 2238728, 1121123211234321], None),
+        (True, [[1766280, 406491, 2568889], [11111111111, 20487, 760325]], [None, None]),
+    ],
+)
+def test_lca_all_missing(ids, domulti, result):
+    assert pytaxonkit.lca(ids, multi=domulti, skip_deleted=True, skip_unfound=True) == result
+
+
+@pytest.mark.parametrize("multi", [True, False])
+def test_lca_empty(multi):
+    with pytest.warns(UserWarning, match="No input for pytaxonkit.lca"):
+        result = pytaxonkit.lca([], multi=multi)
+        assert result is None
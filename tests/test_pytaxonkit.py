@@ -0,0 +1,555 @@
+# -------------------------------------------------------------------------------------------------
+# Copyright (c) 2020, Battelle National Biodefense Institute.
+#
+# This file is part of pytaxonkit (http://github.com/bioforensics/pytaxonkit)
+# and is licensed under the BSD license.
+#
+#
+# This Software was prepared for the Department of Homeland Security
+# (DHS) by the Battelle National Biodefense Institute, LLC (BNBI) as
+# part of contract HSHQDC-15-C-00064 to manage and operate the National
+# Biodefense Analysis and Countermeasures Center (NBACC), a Federally
+# Funded Research and Development Center.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# -------------------------------------------------------------------------------------------------
+
+
+import os
+import pandas as pd
+from pandas import UInt32Dtype
+import pytaxonkit
+import pytest
+import subprocess
+import sys
+
+
+def data_file(filename):
+    return os.path.join(os.path.dirname(__file__), "data", filename)
+
+
+def test_open_taxonkit_spawn_failure(monkeypatch):
+    started = list()
+
+    def popen(*args, **kwargs):
+        proc = subprocess.Popen(*args, **kwargs)
+        started.append(proc)
+        return proc
+
+    monkeypatch.setattr(pytaxonkit, "Popen", popen)
+    sleeper = [sys.executable, "-c", "import time; time.sleep(60)"]
+    with pytest.raises(OSError):
+        with pytaxonkit._open_taxonkit(sleeper, ["pytaxonkit-no-such-command"]):
+            pass  # pragma: no cover
+    assert len(started) == 1
+    assert started[0].returncode is not None
+    assert started[0].stdout.closed
+    assert started[0].stderr.closed
+
+
+def test_join_ids():
+    assert pytaxonkit._join_ids([9606, 9598], ",") == "9606,9598"
+    assert pytaxonkit._join_ids(pd.Series([9606, 9598]), "\n") == "9606\n9598"
+    assert pytaxonkit._join_ids(pd.Series([], dtype="int64"), "\n") == ""
+
+
+def test_id_lines():
+    assert "".join(pytaxonkit._id_lines([9606, 9598])) == "9606\n9598\n"
+    chunks = pytaxonkit._id_lines((taxid for taxid in range(1, 6)), chunksize=2)
+    assert list(chunks) == ["1\n2\n", "3\n4\n", "5\n"]
+    assert pytaxonkit._id_lines(iter([])) is None
+    assert pytaxonkit._id_lines(pd.Series([], dtype="int64")) is None
+
+
+def test_id_batches():
+    batches = pytaxonkit._id_batches(range(1, 6), 2)
+    assert list(batches) == [["1", "2"], ["3", "4"], ["5"]]
+    assert pytaxonkit._id_batches([], 2) is None
+
+
+def test_dedup_ids():
+    assert pytaxonkit._dedup_ids([9606, 562, "9606", 9606]) == (["9606", "562"], [0, 1, 0, 0])
+    assert pytaxonkit._dedup_ids(pd.Series([9606, 562])) == (["9606", "562"], None)
+    assert pytaxonkit._dedup_ids([9606, "", 9606, "#9606"]) == (["9606"], [0, 0])
+    assert pytaxonkit._dedup_ids([9606, " ", 9606]) == (["9606", " "], [0, 1, 0])
+    assert pytaxonkit._dedup_ids([9606, "", 562]) == (["9606", "562"], None)
+
+
+def test_collect_frames():
+    def run(idlist):
+        # Like taxonkit, report nothing for blank lines
+        values = [line for chunk in idlist for line in chunk.split("\n") if line.strip()]
+        return pd.DataFrame({"TaxID": values})
+
+    ids, codes = ["9606", " ", "562"], [0, 1, 0, 2]
+    data = pytaxonkit._collect_frames(run, pytaxonkit._id_shards(ids, 1), ids, codes, 1)
+    assert data.TaxID.tolist() == ["9606", "9606", "562"]
+    assert data.index.tolist() == [0, 1, 2]
+
+
+def test_id_shards():
+    shards = pytaxonkit._id_shards(range(5), 2)
+    assert [list(shard) for shard in shards] == [["0\n1\n2\n"], ["3\n4\n"]]
+    assert [list(shard) for shard in pytaxonkit._id_shards(range(2), 4)] == [["0\n"], ["1\n"]]
+    assert pytaxonkit._id_shards([], 2) is None
+
+
+def test_concat_frames():
+    frames = [
+        pd.DataFrame({"TaxID": [1], "Rank": pd.Series(["no rank"], dtype="category")}),
+        pd.DataFrame({"TaxID": [9606], "Rank": pd.Series(["species"], dtype="category")}),
+    ]
+    data = pytaxonkit._concat_frames(frames)
+    assert data.index.tolist() == [0, 1]
+    assert data.Rank.dtype == "category"
+    assert data.Rank.tolist() == ["no rank", "species"]
+
+
+def test_validate_data_dir():
+    realdir = os.path.realpath(os.path.expanduser("~/.taxonkit/"))
+    assert pytaxonkit.validate_data_dir(os.path.expanduser("~/.taxonkit/")) == realdir
+    with pytest.raises(pytaxonkit.NCBITaxonomyDumpNotFoundError):
+        assert pytaxonkit.validate_data_dir("/path/to/a/non/existent/directory/taxonkit")
+
+
+def test_validate_threads(capsys):
+    assert pytaxonkit.validate_threads(None) is None
+    assert pytaxonkit.validate_threads(2) == "2"
+    assert pytaxonkit.validate_threads("16") == "16"
+    out, err = capsys.readouterr()
+    assert out == err == ""
+    assert pytaxonkit.validate_threads("StuffedCrust") is None
+    out, err = capsys.readouterr()
+    assert out == ""
+    m = '[pytaxonkit::warning] invalid thread count "StuffedCrust"; resetting to taxonkit default'
+    assert err.strip() == m
+
+
+def test_validate_threads_default(monkeypatch):
+    monkeypatch.setattr(pytaxonkit, "DEFAULT_THREADS", 8)
+    assert pytaxonkit.validate_threads(None) == "8"
+    assert pytaxonkit.validate_threads(2) == "2"
+
+
+def test_import_without_pandas():
+    code = "import sys, pytaxonkit; assert 'pandas' not in sys.modules"
+    cwd = os.path.dirname(os.path.abspath(pytaxonkit.__file__))
+    subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True)
+
+
+# -------------------------------------------------------------------------------------------------
+# taxonkit list
+# -------------------------------------------------------------------------------------------------
+
+
+def test_list_leaves(capsys):
+    result = pytaxonkit.list([8204, 2468], debug=True)
+    assert len(result) == 2
+    top_level_taxa = [taxon for taxon, tree in result]
+    sub_trees = [tree for taxon, tree in result]
+    assert top_level_taxa == [
+        pytaxonkit.BasicTaxon(taxid=8204, rank="species", name="Anarhichas lupus"),
+        pytaxonkit.BasicTaxon(taxid=2468, rank="species", name="Plasmid NR79"),
+    ]
+    assert sub_trees == [{}, {}]
+    out, err = capsys.readouterr()
+    data = "[pytaxonkit::debug] taxonkit list --json --show-name --show-rank --ids 8204,2468"
+    assert err.strip() == data
+
+
+@pytest.mark.parametrize(
+    "taxid,taxon,subtaxon,subsubtaxon",
+    [
+        (
+            83882,
+            pytaxonkit.BasicTaxon(taxid=83882, rank="genus", name="Apogon"),
+            pytaxonkit.BasicTaxon(taxid=638272, rank="subgenus", name="Apogon"),
+            pytaxonkit.BasicTaxon(taxid=308069, rank="species", name="Apogon maculatus"),
+        ),
+        (
+            44568,
+            pytaxonkit.BasicTaxon(taxid=44568, rank="genus", name="Parasimulium"),
+            pytaxonkit.BasicTaxon(taxid=61057, rank="subgenus", name="Parasimulium"),
+            pytaxonkit.BasicTaxon(taxid=61060, rank="species", name="Parasimulium crosskeyi"),
+        ),
+    ],
+)
+def test_list_genera(taxid, taxon, subtaxon, subsubtaxon):
+    result = pytaxonkit.list([taxid], threads=1)  # Nota bene: `list` here is `pytaxonkit.list`
+    tax, tree = next(iter(result))
+    subtax, subtree = next(iter(tree))
+    subsubtax, subsubtree = next(iter(subtree))
+    assert tax == taxon
+    assert subtax == subtaxon
+    assert subsubtax == subsubtaxon
+    assert subsubtree == {}
+
+
+def test_list_str():
+    result = pytaxonkit.list(["20019"])
+    with open(data_file("sweetleaf.json"), "r") as fh:
+        assert str(result) == fh.read().strip()
+
+
+def test_list_empty():
+    with pytest.warns(UserWarning, match="No input for pytaxonkit.list"):
+        result = pytaxonkit.list([])
+        assert result is None
+
+
+def test_list_batches(capsys):
+    result = pytaxonkit.list([8204, 2468, 9605], raw=True, batch_size=2, debug=True)
+    assert [key.split()[0] for key in result] == ["8204", "2468", "9605"]
+    out, err = capsys.readouterr()
+    assert err.strip().split("\n") == [
+        "[pytaxonkit::debug] taxonkit list --json --show-name --show-rank --ids 8204,2468",
+        "[pytaxonkit::debug] taxonkit list --json --show-name --show-rank --ids 9605",
+    ]
+
+
+def test_list_workers():
+    taxids = [8204, 2468, 9605, 9903, 268197]
+    result = pytaxonkit.list(taxids, raw=True, workers=2)
+    assert [key.split()[0] for key in result] == ["8204", "2468", "9605", "9903", "268197"]
+    assert result == pytaxonkit.list(taxids, raw=True)
+
+
+def test_list_many():
+    # Each argument on the command line is limited in length (128 KiB on Linux)
+    result = pytaxonkit.list([8204] * 30000, raw=True)
+    assert result == {"8204 [species] Anarhichas lupus": {}}
+
+
+@pytest.mark.parametrize(
+    "taxonstr,taxon",
+    [
+        ("9606 [species] Homo sapiens", pytaxonkit.BasicTaxon(9606, "species", "Homo sapiens")),
+        (
+            "2665952 [no rank] environmental samples",
+            pytaxonkit.BasicTaxon(2665952, "no rank", "environmental samples"),
+        ),
+        (
+            "39485 [species] [Eubacterium] rectale",
+            pytaxonkit.BasicTaxon(39485, "species", "[Eubacterium] rectale"),
+        ),
+    ],
+)
+def test_parse_taxon(taxonstr, taxon):
+    assert pytaxonkit._parse_taxon(taxonstr) == taxon
+
+
+def test_parse_taxon_rank_interned():
+    first = pytaxonkit._parse_taxon("9606 [species] Homo sapiens")
+    second = pytaxonkit._parse_taxon("".join(["1425170 [spec", "ies] Homo heidelbergensis"]))
+    assert first.rank is second.rank
+
+
+def test_list_traverse_deep():
+    tree = dict()
+    subtree = tree
+    for taxid in range(1, 5001):
+        subtree[f"{taxid} [no rank] taxon {taxid}"] = dict()
+        subtree = subtree[f"{taxid} [no rank] taxon {taxid}"]
+    taxa = [taxon for taxon in pytaxonkit.ListResult(tree).traverse]
+    assert len(taxa) == 5000
+    assert taxa[-1] == pytaxonkit.BasicTaxon(taxid=5000, rank="no rank", name="taxon 5000")
+
+
+def test_list_traverse_raw():
+    tree = {
+        "9605 [genus] Homo": {"9606 [species] Homo sapiens": {}},
+        "1118549 [species] [Eubacterium] sp. 14-2": {},
+    }
+    result = pytaxonkit.ListResult(tree)
+    taxa = list(result.traverse_raw)
+    assert taxa == [tuple(taxon) for taxon in result.traverse]
+    assert taxa[-1] == (1118549, "species", "[Eubacterium] sp. 14-2")
+    assert type(taxa[0]) is tuple
+
+
+def test_list_to_frame():
+    tree = {
+        "9605 [genus] Homo": {
+            "9606 [species] Homo sapiens": {
+                "63221 [subspecies] Homo sapiens neanderthalensis": {}
+            },
+            "1425170 [species] Homo heidelbergensis": {},
+        },
+        "2 [superkingdom] Bacteria": {},
+    }
+    result = pytaxonkit.ListResult(tree)
+    data = result.to_frame()
+    assert data.TaxID.tolist() == [taxon.taxid for taxon in result.traverse]
+    assert data.Name.tolist() == [taxon.name for taxon in result.traverse]
+    assert data.ParentTaxID.tolist() == [pd.NA, 9605, 9606, 9605, pd.NA]
+    assert data.TaxID.dtype == UInt32Dtype()
+    assert data.Rank.dtype == "category"
+    assert len(pytaxonkit.ListResult({}).to_frame()) == 0
+
+
+def test_list_taxids():
+    tree = {
+        "9605 [genus] Homo": {
+            "9606 [species] Homo sapiens": {
+                "63221 [subspecies] Homo sapiens neanderthalensis": {}
+            },
+        },
+        "2 [superkingdom] Bacteria": {},
+    }
+    result = pytaxonkit.ListResult(tree)
+    assert result.taxids == {9605, 9606, 63221, 2}
+    assert 63221 in result
+    assert "9606" in result
+    assert 9604 not in result
+    assert "abc" not in result
+    assert None not in result
+    assert 9606.0 in result
+    assert 9606.5 not in result
+    assert True not in pytaxonkit.ListResult({"1 [no rank] root": {}})
+    assert len(result) == 2
+
+
+# -------------------------------------------------------------------------------------------------
+# taxonkit lineage
+# -------------------------------------------------------------------------------------------------
+
+
+def test_lineage(capsys):
+    result = pytaxonkit.lineage(["1082657", "265720", "1191594", "106649", "2868953"], debug=True)
+    assert result.TaxID.equals(pd.Series([1082657, 265720, 1191594, 106649, 2868953]))
+    assert result.Code.equals(pd.Series([1082657, 265720, 1191594, 106649, 2868953]))
+    assert result.Lineage.equals(
+        pd.Series(
+            [
+                "Eukaryota;Discosea;;Longamoebia;Acanthamoebidae;Acanthamoeba;Acanthamoeba sp. TW95",
+                "Bacteria;Bacteroidota;Bacteroidia;Bacteroidales;Porphyromonadaceae;Porphyromonas;Porphyromonas genomosp. P3",
+                "Eukaryota;Basidiomycota;Agaricomycetes;Russulales;Russulaceae;Russula;Russula carmesina",
+                "Bacteria;Pseudomonadota;Gammaproteobacteria;Moraxellales;Moraxellaceae;Acinetobacter;Acinetobacter guillouiae",
+                "Eukaryota;Arthropoda;Insecta;Hemiptera;Lygaeidae;Lygaeosoma;Lygaeosoma sardeum",
+            ]
+        )
+    )
+    assert result.LineageTaxIDs.equals(
+        pd.Series(
+            [
+                "2759;555280;;1485168;33677;5754;1082657",
+                "2;976;200643;171549;171551;836;265720",
+                "2759;5204;155619;452342;5401;5402;1191593",
+                "2;1224;1236;2887326;468;469;106649",
+                "2759;6656;50557;7524;7533;2868952;2868953",
+            ]
+        )
+    )
+    ranks = pd.Series(["species", "species", "varietas", "species", "species"], dtype="category")
+    assert result.Rank.equals(ranks)
+
+    out, err = capsys.readouterr()
+    assert "taxonkit lineage --show-lineage-taxids --show-rank --show-status-code" in err
+    assert "taxonkit reformat --lineage-field 3 --show-lineage-taxids" in err
+
+
+def test_lineage_single_taxid():
+    result = pytaxonkit.lineage([128370])
+    assert result.TaxID.iloc[0] == 128370
+
+
+def test_lineage_dedup():
+    taxids = [128370, 9606, 128370, 128370, 9606]
+    result = pytaxonkit.lineage(taxids)
+    assert result.TaxID.tolist() == taxids
+    assert result.index.tolist() == [0, 1, 2, 3, 4]
+    assert result.equals(pytaxonkit.lineage(taxids, dedup=False))
+
+
+def test_lineage_workers():
+    taxids = [128370, 9606, 1649473, 1401311, 9606]
+    result = pytaxonkit.lineage(taxids, workers=3)
+    assert result.index.tolist() == [0, 1, 2, 3, 4]
+    assert result.Rank.dtype == "category"
+    assert result.equals(pytaxonkit.lineage(taxids))
+
+
+def test_lineage_workers_unknown():
+    # The second shard holds only unknown taxids
+    taxids = [9606, 562, "12a", "13b"]
+    result = pytaxonkit.lineage(taxids, workers=2)
+    assert result.equals(pytaxonkit.lineage(taxids))
+
+
+def test_lineage_non_numeric():
+    result = pytaxonkit.lineage([9606, "12a"])
+    assert result.TaxID.astype(str).tolist() == ["9606", "12a"]
+
+
+def test_lineage_unknown_text_columns():
+    result = pytaxonkit.lineage(["12a"])
+    for column in ("Name", "FullLineage", "FullLineageTaxIDs", "FullLineageRanks"):
+        assert not pd.api.types.is_float_dtype(result[column])
+
+
+def test_lineage_dedup_blank():
+    result = pytaxonkit.lineage([9606, "", 9606])
+    assert result.TaxID.tolist() == [9606, 9606]
+    assert result.equals(pytaxonkit.lineage([9606, "", 9606], dedup=False))
+    result = pytaxonkit.lineage([9606, " ", 9606])
+    assert result.equals(pytaxonkit.lineage([9606, " ", 9606], dedup=False))
+
+
+def test_lineage_threads():
+    result = pytaxonkit.lineage(["200643"], threads=1)
+    assert result.FullLineageRanks.iloc[0] == "no rank;superkingdom;clade;clade;phylum;class"
+    expected = "cellular organisms;Bacteria;FCB group;Bacteroidota/Chlorobiota group;Bacteroidota;Bacteroidia"
+    assert result.FullLineage.iloc[0] == expected
+
+
+def test_lineage_name():
+    result = pytaxonkit.lineage(["526061"])
+    assert result.Name.iloc[0] == "Henosepilachna sp. AGBA-2008"
+
+
+def test_lineage_prefix():
+    result = pytaxonkit.lineage([64191], prefix=True)
+    obs_out = result.Lineage.iloc[0]
+    exp_out = "k__Bacteria;p__Pseudomonadota;c__Alphaproteobacteria;o__;f__;g__;s__magnetic proteobacterium strain rj53"
+    assert exp_out == obs_out
+    result = pytaxonkit.lineage(["229933"], prefix=True, prefix_p="PHYLUM:", prefix_c="CLASS:")
+    obs_out = result.Lineage.iloc[0]
+    exp_out = "k__Bacteria;PHYLUM:Pseudomonadota;CLASS:Alphaproteobacteria;o__Rickettsiales;f__Anaplasmataceae;g__Wolbachia;s__Wolbachia endosymbiont of Togo hemipterus (strain 1)"
+    assert exp_out == obs_out
+
+
+def test_lineage_prefix_no_effect():
+    result = pytaxonkit.lineage([325064], prefix_o="ORDER:")
+    obs_out = result.Lineage.iloc[0]
+    exp_out = (
+        "Eukaryota;Discosea;Flabellinia;;Vannellidae;Platyamoeba;Platyamoeba sp. strain AFSM6/I"
+    )
+    assert exp_out == obs_out
+
+
+def test_lineage_bad_prefix():
+    with pytest.raises(TypeError, match=r'unexpected keyword argument "prefix_bOguSrANk"'):
+        pytaxonkit.lineage([325064], prefix_bOguSrANk="BOGUS:")
+    with pytest.raises(TypeError, match=r'unexpected keyword argument "prefix_g_s"'):
+        pytaxonkit.lineage([325064], prefix_g_s="GS:")
+    with pytest.raises(TypeError, match=r'unexpected keyword argument "prefix_gs"'):
+        pytaxonkit.lineage([325064], prefix_gs="GS:")
+    with pytest.raises(TypeError, match=r'unexpected keyword argument "prefix_"'):
+        pytaxonkit.lineage([325064], prefix_="?")
+    with pytest.raises(TypeError, match=r'unexpected keyword argument "breakfast_sausage"'):
+        pytaxonkit.lineage([325064], breakfast_sausage="YUM")
+
+
+def test_lineage_pseudo_strain():
+    result = pytaxonkit.lineage(
+        [36827],
+        formatstr="{k};{p};{c};{o};{f};{g};{s};{t}",
+        fill_missing=True,
+        pseudo_strain=True,
+        prefix=True,
+    )
+    obs_out = result.Lineage.iloc[0]
+    exp_out = "k__Bacteria;p__Bacillota;c__Clostridia;o__Eubacteriales;f__Clostridiaceae;g__Clostridium;s__Clostridium botulinum;t__Clostridium botulinum B"
+    assert exp_out == obs_out
+
+
+def test_name_debug(capsys):
+    result = pytaxonkit.name([207661, 1353792, 1597281], debug=True)
+    assert result.Name.equals(
+        pd.Series(
+            [
+                "Ahnfeltiopsis concinna",
+                "Picobirnavirus turkey/USA-1512/2010",
+                "Isopoda sp. NZAC 03013534",
+            ]
+        )
+    )
+    out, err = capsys.readouterr()
+    assert "taxonkit lineage --show-name --no-lineage" in err
+
+
+def test_name_dedup():
+    result = pytaxonkit.name([6, 9606, 6])
+    assert result.Name.tolist() == ["Azorhizobium", "Homo sapiens", "Azorhizobium"]
+
+    assert result.equals(pytaxonkit.name([6, 9606, 6], workers=2))
+
+
+def test_name_workers_unknown():
+    # The second shard holds only unknown taxids
+    taxids = [9606, 562, "12a", "13b"]
+    result = pytaxonkit.name(taxids, workers=2)
+    assert result.equals(pytaxonkit.name(taxids))
+
+
+def test_name_regression():
+    result = pytaxonkit.name([6])
+    print(result)
+    assert len(result) == 1
+    assert result.Name[0] == "Azorhizobium"
+
+
+def test_lineage_empty():
+    with pytest.warns(UserWarning, match="No input for pytaxonkit.lineage"):
+        result = pytaxonkit.lineage([])
+        assert result is None
+
+
+def test_name_empty():
+    with pytest.warns(UserWarning, match="No input for pytaxonkit.name"):
+        result = pytaxonkit.name([])
+        assert result is None
+
+
+# -------------------------------------------------------------------------------------------------
+# taxonkit name2taxid
+# -------------------------------------------------------------------------------------------------
+
+
+def test_name2taxid(capsys):
+    result = pytaxonkit.name2taxid(
+        ["Chaetocerotales", "Diptera", "Rickettsiales", "Hypocreales"], debug=True
+    )
+    taxids = pd.Series([265576, 7147, 766, 5125], dtype=UInt32Dtype())
+    ranks = pd.Series(["order", "order", "order", "order"], dtype="category")
+    assert result.TaxID.equals(taxids)
+    assert result.Rank.equals(ranks)
+
+    out, err = capsys.readouterr()
+    assert "[pytaxonkit::debug] taxonkit name2taxid --show-rank" in err
+
+
+def test_name2taxid_threads():
+    result = pytaxonkit.name2taxid(["FCB group"], threads="1")
+    assert str(result) == "        Name    TaxID   Rank\n0  FCB group  1783270  clade"
+
+
+def test_name2taxid_empty():
+    with pytest.warns(UserWarning, match="No input for pytaxonkit.name2taxid"):
+        result = pytaxonkit.name2taxid([])
+        assert result is None